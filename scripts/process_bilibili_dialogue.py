@@ -4,9 +4,10 @@ import json
 import os
 import re
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, TextIO, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
 USER_AGENT = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -15,9 +16,32 @@ USER_AGENT = (
 )
 COOKIE_FILE = os.path.expanduser("~/.openclaw/workspace/bilibili_cookie.txt")
 
+_BVID_RE = re.compile(r"BV[0-9A-Za-z]{10}")
+_PUNCT_RUN_RE = re.compile(r"，{2,}|。{2,}")
+_BOOK_RE = re.compile(r"《([^》]+)》")
+_PAREN_RE = re.compile(r"\（.*?\）|\(.*?\)")
+_NONCJK_RE = re.compile(r"[^\u4e00-\u9fffA-Za-z0-9]+")
+_LEADNUM_RE = re.compile(r"^\d+[.\s]*")
+
+TEACHER_CUES = ["同学们", "今天这节课", "我们一起", "我请", "开始吧", "大点声音", "谁能", "谁来", "为什么", "对不对", "下课"]
+CLASS_CUES = ["老师好", "老师再见", "同意吗", "大家一起说"]
+QUESTION_CUES = ["吗", "呢", "谁", "为什么", "怎么", "有没有"]
+TURN_QUESTION_CUES = ["吗", "呢", "为什么", "怎么", "谁", "有没有", "对不对", "是不是"]
+
+
+def _cue_re(cues: List[str]) -> re.Pattern:
+    # 每组线索词编译成一个交替正则，单次扫描即可判断整行是否命中任一线索
+    return re.compile("|".join(re.escape(k) for k in cues))
+
+
+_TEACHER_CUE_RE = _cue_re(TEACHER_CUES)
+_CLASS_CUE_RE = _cue_re(CLASS_CUES)
+_QUESTION_CUE_RE = _cue_re(QUESTION_CUES)
+_TURN_QUESTION_RE = _cue_re(TURN_QUESTION_CUES)
+
 
 def parse_bvid(value: str) -> str:
-    m = re.search(r"BV[0-9A-Za-z]{10}", value.strip())
+    m = _BVID_RE.search(value.strip())
     if m:
         return m.group(0)
     raise ValueError("Cannot find BV id from input. Provide BV id or bilibili video URL.")
@@ -29,24 +53,30 @@ def load_cookie() -> str:
     return ""
 
 
-def http_json(url: str, *, params: Dict = None, cookie: str = "") -> Dict:
-    headers = {"User-Agent": USER_AGENT, "Referer": "https://www.bilibili.com/"}
-    if cookie:
-        headers["Cookie"] = cookie
-    resp = requests.get(url, params=params, headers=headers, timeout=20)
+def make_session() -> requests.Session:
+    # 复用同一个连接池，view / dm/view / 字幕 JSON 三次请求无需重复 TCP+TLS 握手
+    session = requests.Session()
+    session.headers.update({"User-Agent": USER_AGENT, "Referer": "https://www.bilibili.com/"})
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    return session
+
+
+def http_json(session: requests.Session, url: str, *, params: Dict = None, cookie: str = "") -> Dict:
+    headers = {"Cookie": cookie} if cookie else None
+    resp = session.get(url, params=params, headers=headers, timeout=20)
     resp.raise_for_status()
-    return resp.json()
+    return json.loads(resp.content)
 
 
-def get_video_info(bvid: str, cookie: str) -> Dict:
-    data = http_json("https://api.bilibili.com/x/web-interface/view", params={"bvid": bvid}, cookie=cookie)
+def get_video_info(session: requests.Session, bvid: str, cookie: str) -> Dict:
+    data = http_json(session, "https://api.bilibili.com/x/web-interface/view", params={"bvid": bvid}, cookie=cookie)
     if data.get("code") != 0:
         raise RuntimeError(f"view api failed: code={data.get('code')} msg={data.get('message')}")
     return data["data"]
 
 
-def get_subtitle_url(cid: int, cookie: str) -> str:
-    data = http_json("https://api.bilibili.com/x/v2/dm/view", params={"oid": cid, "type": 1}, cookie=cookie)
+def get_subtitle_url(session: requests.Session, cid: int, cookie: str) -> str:
+    data = http_json(session, "https://api.bilibili.com/x/v2/dm/view", params={"oid": cid, "type": 1}, cookie=cookie)
     if data.get("code") != 0:
         raise RuntimeError(f"dm/view api failed: code={data.get('code')} msg={data.get('message')}")
     subtitles = data.get("data", {}).get("subtitle", {}).get("subtitles", [])
@@ -61,32 +91,34 @@ def get_subtitle_url(cid: int, cookie: str) -> str:
     return subtitle_url
 
 
-def fetch_subtitle_body(subtitle_url: str) -> List[Dict]:
-    data = requests.get(subtitle_url, timeout=20).json()
-    return [x for x in data.get("body", []) if str(x.get("content", "")).strip()]
-
+def fetch_subtitle_body(session: requests.Session, subtitle_url: str) -> List[Tuple[float, float, str]]:
+    # 一次性把字幕条目转换为 (from, to, content) 元组，后续处理不再反复查字典
+    data = json.loads(session.get(subtitle_url, timeout=20).content)
+    rows: List[Tuple[float, float, str]] = []
+    for x in data.get("body", []):
+        content = str(x.get("content", "")).strip()
+        if content:
+            rows.append((float(x.get("from", 0)), float(x.get("to", 0)), content))
+    return rows
 
-def label_speakers(lines: List[str]) -> List[str]:
-    teacher_cues = ["同学们", "今天这节课", "我们一起", "我请", "开始吧", "大点声音", "谁能", "谁来", "为什么", "对不对", "下课"]
-    class_cues = ["老师好", "老师再见", "同意吗", "大家一起说"]
-    question_cues = ["吗", "呢", "谁", "为什么", "怎么", "有没有"]
 
-    out: List[str] = []
+def label_and_merge(lines: List[str]) -> List[Tuple[str, str]]:
+    turns: List[Tuple[str, str]] = []
     mode = "老师"
     expect_student = False
 
     for line in lines:
-        if any(k in line for k in class_cues):
+        if _CLASS_CUE_RE.search(line):
             spk = "全班"
             expect_student = False
-        elif any(k in line for k in teacher_cues):
+        elif _TEACHER_CUE_RE.search(line):
             spk = "老师"
         elif expect_student:
             spk = "学生"
         else:
             spk = mode
 
-        if spk == "老师" and (line.endswith("吗") or line.endswith("呢") or any(k in line for k in question_cues)):
+        if spk == "老师" and _QUESTION_CUE_RE.search(line):
             expect_student = True
         elif spk in ("学生", "全班"):
             expect_student = False
@@ -97,54 +129,38 @@ def label_speakers(lines: List[str]) -> List[str]:
             # 以便全班发言后续若无明显线索仍延续上一个明确说话人。
             mode = spk
 
-        out.append(f"{spk}：{line}")
-    return out
-
-
-def merge_turns(labeled: List[str]) -> List[Tuple[str, str]]:
-    turns: List[Tuple[str, str]] = []
-    for line in labeled:
-        if "：" not in line:
-            continue
-        spk, txt = line.split("：", 1)
-        spk = spk.strip()
-        txt = txt.strip()
-        if not txt:
-            continue
+        # 同一说话人的连续字幕行直接并入上一轮发言
         if turns and turns[-1][0] == spk:
-            turns[-1] = (spk, turns[-1][1] + "，" + txt)
+            turns[-1] = (spk, turns[-1][1] + "，" + line)
         else:
-            turns.append((spk, txt))
+            turns.append((spk, line))
     return turns
 
 
 def punctuate(text: str) -> str:
-    text = re.sub(r"[，]{2,}", "，", text).strip("，。？！；、 ")
+    text = text.strip("，。？！；、 ")
     if not text:
         return ""
-    q_cues = ["吗", "呢", "为什么", "怎么", "谁", "有没有", "对不对", "是不是"]
-    if any(c in text for c in q_cues) or text.endswith(("吗", "呢")):
+    if _TURN_QUESTION_RE.search(text):
         return text + "？"
     return text + "。"
 
 
-def build_smooth(turns: List[Tuple[str, str]]) -> str:
-    lines = ["【逐字稿增强版（对话体·通顺增强）】"]
+def write_smooth(fh: TextIO, turns: List[Tuple[str, str]]) -> None:
+    fh.write("【逐字稿增强版（对话体·通顺增强）】")
     for spk, txt in turns:
-        for _ in range(2):
-            txt = txt.replace("，，", "，").replace("。。", "。")
-        lines += ["", f"{spk}：{punctuate(txt)}"]
-    return "\n".join(lines)
+        txt = _PUNCT_RUN_RE.sub(lambda m: m.group(0)[0], txt)
+        fh.write(f"\n\n{spk}：{punctuate(txt)}")
 
 
 def extract_theme(title: str) -> str:
     t = title.strip()
     if "：" in t:
         t = t.split("：", 1)[1]
-    m = re.search(r"《([^》]+)》", t)
+    m = _BOOK_RE.search(t)
     if m:
         return m.group(1)
-    t = re.sub(r"\（.*?\）|\(.*?\)", "", t)
+    t = _PAREN_RE.sub("", t)
     return t.strip() or title
 
 
@@ -153,9 +169,9 @@ def build_product_base_name(title: str) -> str:
     theme = extract_theme(title).replace("的故事", "").strip()
     if "：" in title:
         author = title.split("：", 1)[0]
-    author = re.sub(r"^\d+[.\s]*", "", author).strip()
+    author = _LEADNUM_RE.sub("", author).strip()
     base = (author + theme).strip() or "名师课堂"
-    base = re.sub(r"[^\u4e00-\u9fffA-Za-z0-9]+", "", base)
+    base = _NONCJK_RE.sub("", base)
     return base or "名师课堂"
 
 
@@ -169,20 +185,21 @@ def main() -> None:
 
     bvid = parse_bvid(args.input)
     cookie = load_cookie()
+    session = make_session()
 
-    info = get_video_info(bvid, cookie)
+    info = get_video_info(session, bvid, cookie)
     title = info.get("title", bvid)
     pages = info.get("pages", [])
     if not pages:
         raise RuntimeError("No pages found.")
 
     cid = pages[0]["cid"]
-    subtitle_url = get_subtitle_url(cid, cookie)
-    subtitle_body = fetch_subtitle_body(subtitle_url)
+    subtitle_url = get_subtitle_url(session, cid, cookie)
+    subtitle_body = fetch_subtitle_body(session, subtitle_url)
     if args.start > 0 or args.end > 0:
         end = args.end if args.end > 0 else float("inf")
-        subtitle_body = [x for x in subtitle_body if x.get("from", 0) >= args.start and x.get("from", 0) < end]
-    raw_lines = [str(x.get("content", "")).strip() for x in subtitle_body if str(x.get("content", "")).strip()]
+        subtitle_body = [row for row in subtitle_body if args.start <= row[0] < end]
+    raw_lines = [content for _, _, content in subtitle_body]
     if not raw_lines:
         raise RuntimeError("Subtitle body is empty.")
 
@@ -192,23 +209,18 @@ def main() -> None:
 
     # 输出原始字幕（带时间戳、无说话人标注），供 Claude 优化对话稿时参照
     raw_subtitle_file = out_dir / f"{base_name_for_dir}原始字幕.txt"
-    raw_subtitle_lines = []
-    for item in subtitle_body:
-        f = item.get("from", 0)
-        t = item.get("to", 0)
-        content = str(item.get("content", "")).strip()
-        if content:
-            fm, fs = int(f) // 60, int(f) % 60
-            tm, ts = int(t) // 60, int(t) % 60
-            raw_subtitle_lines.append(f"[{fm:02d}:{fs:02d}-{tm:02d}:{ts:02d}] {content}")
-    raw_subtitle_file.write_text("\n".join(raw_subtitle_lines), encoding="utf-8")
+    with raw_subtitle_file.open("w", encoding="utf-8") as fh:
+        for f, t, content in subtitle_body:
+            fm, fs = divmod(int(f), 60)
+            tm, ts = divmod(int(t), 60)
+            fh.write(f"[{fm:02d}:{fs:02d}-{tm:02d}:{ts:02d}] {content}\n")
 
-    labeled = label_speakers(raw_lines)
-    turns = merge_turns(labeled)
+    turns = label_and_merge(raw_lines)
     base_name = base_name_for_dir
 
     smooth_file = out_dir / f"{base_name}通顺增强对话稿.txt"
-    smooth_file.write_text(build_smooth(turns), encoding="utf-8")
+    with smooth_file.open("w", encoding="utf-8") as fh:
+        write_smooth(fh, turns)
 
     print("RESULT_JSON:" + json.dumps({
         "bvid": bvid,